@@ -2,6 +2,13 @@ from server_dinner import mcp
 import sys
 import traceback
 
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    # uvloop is unix-only; the default loop works everywhere else
+    pass
+
 if __name__ == "__main__":
     try:
         print("[Starting MCP server…]", file=sys.stderr, flush=True)
@@ -1,8 +1,17 @@
 from __future__ import annotations
-import os, math, re, json
+import asyncio
+import atexit
+import functools
+import hashlib
+import os, math, re, sys
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, TypedDict
 from pathlib import Path
-import httpx
+import aiohttp
+import msgpack
+import numpy as np
+import orjson
+from cachetools import TTLCache
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 
@@ -12,9 +21,40 @@ YELP_API_KEY = os.getenv("YELP_API_KEY")
 
 mcp = FastMCP("WhatToEat")
 
-STATE: Dict[str, Dict[str, Any]] = {}
+# Review-count normalization constant: scores saturate at 500 reviews
+_LOG10_501 = math.log10(500 + 1)
+_INV_LOG10_501_x2 = 2.0 / _LOG10_501
+
+# Precompiled patterns for the snippet cleanup and refine_dinner parsing
+_WS_RE = re.compile(r"\s+")
+_NO_RE = re.compile(r"(no|not)\s+([a-zA-Z\- ]+)")
+_CUIS_RE = re.compile(r"(?:want|craving|more|prefer)\s+([a-zA-Z\- ]+)")
+
+# Profiles live on disk as msgpack files; only a small LRU of deserialized
+# dicts is kept in RAM, so long-running servers don't accumulate every
+# profile's last_results, and memory survives restarts.
+_STATE_DIR = Path(__file__).with_name("state")
+
+@functools.lru_cache(maxsize=64)
+def _load_profile(p: str) -> Dict[str, Any]:
+    path = _STATE_DIR / f"{p}.msgpack"
+    if path.exists():
+        try:
+            return msgpack.unpackb(path.read_bytes(), raw=False)
+        except Exception:
+            pass
+    return {"prefs": {}, "last_query": None, "last_results": []}
+
 def _profile(p: str) -> Dict[str, Any]:
-    return STATE.setdefault(p, {"prefs": {}, "last_query": None, "last_results": []})
+    return _load_profile(p)
+
+def _save_profile(p: str) -> None:
+    st = _load_profile(p)
+    _STATE_DIR.mkdir(exist_ok=True)
+    path = _STATE_DIR / f"{p}.msgpack"
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(msgpack.packb(st, use_bin_type=True))
+    os.replace(tmp, path)  # atomic swap so a crash can't leave a torn file
 
 class Location(TypedDict, total=False):
     # (lat,lon) or address
@@ -57,6 +97,7 @@ class Restaurant(TypedDict):
     distance_km: float
     phone: Optional[str]
     snippet: Optional[str]
+    _base_score: float   # rating + review term; reused by refine_dinner reranks
 
 class SearchResult(TypedDict):
     query_used: Dict[str, Any]
@@ -68,6 +109,40 @@ def _require_yelp_key() -> str:
         raise RuntimeError("Cannot find YELP_API_KEY.")
     return YELP_API_KEY
 
+# Short-lived in-process caches so repeat queries (refine/search_again on the
+# same profile) skip the network entirely. TTLs stay well under Yelp's
+# 24-hour storage limit.
+_SEARCH_CACHE: TTLCache = TTLCache(maxsize=512, ttl=120)
+_REVIEWS_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=600)
+
+def _cache_key(params: Dict[str, Any]) -> bytes:
+    return hashlib.blake2b(
+        orjson.dumps(params, option=orjson.OPT_SORT_KEYS), digest_size=16
+    ).digest()
+
+# Shared session so all Yelp calls reuse one connection pool instead of
+# paying a fresh TCP+TLS handshake per request.
+_CLIENT: Optional[aiohttp.ClientSession] = None
+
+async def _get_client() -> aiohttp.ClientSession:
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.closed:
+        _CLIENT = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=40, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=8),
+            headers={"Authorization": f"Bearer {_require_yelp_key()}"},
+        )
+    return _CLIENT
+
+def _close_client() -> None:
+    if _CLIENT is not None and not _CLIENT.closed:
+        try:
+            asyncio.run(_CLIENT.close())
+        except RuntimeError:
+            pass
+
+atexit.register(_close_client)
+
 def _km(meters: float) -> float:
     return round(meters / 1000.0, 2)
 
@@ -81,41 +156,189 @@ def _join_address(loc: Dict[str, Any]) -> str:
 def _category_names(cats: List[Dict[str, Any]]) -> List[str]:
     return [c.get("title") for c in cats or []]
 
-def _score_business(b: Dict[str, Any], query: FindQuery) -> float:
-    rating = float(b.get("rating", 0))
-    reviews = float(b.get("review_count", 0))
-    dist_km = _km(float(b.get("distance", 0)))
+def _cat_titles(b: Dict[str, Any]) -> List[str]:
+    # Memoized per business; titles are interned since Yelp categories repeat
+    # heavily across businesses, which cheapens downstream substring/hash work.
+    titles = b.get("_cat_titles")
+    if titles is None:
+        titles = [sys.intern(t) if isinstance(t, str) else t
+                  for t in _category_names(b.get("categories", []))]
+        b["_cat_titles"] = titles
+    return titles
+
+def _extend_unique(lst: List[str], items: List[str]) -> List[str]:
+    # dict.fromkeys dedups while keeping insertion order, so repeated
+    # refinements don't reshuffle the list (and churn the search-cache key)
+    return list(dict.fromkeys(lst + items))
+
+def _hay(b: Dict[str, Any]) -> str:
+    # The lowercase name+categories haystack is scanned by the avoid filter
+    # and the keyword bonus; build it once per business and cache it on the
+    # dict so the string work isn't repeated across passes.
+    hay = b.get("_hay")
+    if hay is None:
+        hay = (b.get("name","") + " " + " ".join(_cat_titles(b))).lower()
+        b["_hay"] = hay
+    return hay
+
+def _compile_terms(terms: List[str]) -> Optional[re.Pattern]:
+    """Build one alternation pattern over lowercased terms.
+
+    A single compiled scan replaces the per-business `any(t in hay ...)` /
+    `sum(1 for t in ...)` nested loops, so each haystack is walked once in C
+    regardless of how many avoid/keyword terms are set.
+    """
+    terms = [t.lower() for t in terms if t]
+    if not terms:
+        return None
+    return re.compile("|".join(map(re.escape, sorted(terms, key=len, reverse=True))))
+
+def _project_business(b: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fields the ranker and Restaurant payload actually read.
+
+    A Yelp business carries ~30 fields; projecting at parse time lets the
+    full decoded tree be released immediately and keeps the search cache and
+    persisted pools small.
+    """
+    return {
+        "id": b.get("id"),
+        "name": b.get("name"),
+        "rating": b.get("rating", 0),
+        "review_count": b.get("review_count", 0),
+        "price": b.get("price"),
+        "url": b.get("url"),
+        "address": _join_address(b.get("location", {})),
+        "display_phone": b.get("display_phone"),
+        "distance": b.get("distance", 0),
+        "_cat_titles": [sys.intern(t) if isinstance(t, str) else t
+                        for t in _category_names(b.get("categories", []))],
+    }
+
+@dataclass
+class ResultPool:
+    """Structure-of-arrays view of one Yelp result page.
+
+    Ranking and filtering only ever touch a handful of fields, so they are
+    extracted once into parallel arrays; the raw dicts are kept solely to
+    materialize Restaurant payloads for the final ranked slice.
+    """
+    ids: List[str]
+    base: np.ndarray            # rating + saturating review term
+    ratings: np.ndarray
+    dist_km: np.ndarray
+    prices: List[Optional[str]]
+    hays: List[str]
+    raw: List[Dict[str, Any]]
+
+    @classmethod
+    def from_businesses(cls, businesses: List[Dict[str, Any]]) -> "ResultPool":
+        n = len(businesses)
+        ratings = np.fromiter((float(b.get("rating", 0)) for b in businesses), dtype=np.float64, count=n)
+        reviews = np.fromiter((float(b.get("review_count", 0)) for b in businesses), dtype=np.float64, count=n)
+        dist_km = np.fromiter((_km(float(b.get("distance", 0))) for b in businesses), dtype=np.float64, count=n)
+        base = ratings + np.minimum(2.0, np.log10(1.0 + reviews) * _INV_LOG10_501_x2)
+        return cls(
+            ids=[b.get("id") for b in businesses],
+            base=base,
+            ratings=ratings,
+            dist_km=dist_km,
+            prices=[b.get("price") for b in businesses],
+            hays=[_hay(b) for b in businesses],
+            raw=businesses,
+        )
+
+# Pools are rebuilt cheaply from the persisted raw list, so the array side
+# lives only in this in-process map (ndarrays don't go through msgpack).
+_POOLS: Dict[str, ResultPool] = {}
+
+def _pool_for(profile: str, st: Dict[str, Any]) -> Optional[ResultPool]:
+    raw = st.get("_raw_pool") or []
+    if not raw:
+        return None
+    pool = _POOLS.get(profile)
+    if pool is None or pool.raw is not raw:
+        pool = ResultPool.from_businesses(raw)
+        _POOLS[profile] = pool
+    return pool
+
+try:
+    from numba import njit
+
+    @njit(cache=True, fastmath=True)
+    def _score_kernel(base, dist_km, max_km, align, kw_bonus, keep):
+        n = base.shape[0]
+        scores = np.empty(n)
+        for i in range(n):
+            over = dist_km[i] - max_km
+            pen = -0.5 * over if over > 0.0 else 0.0
+            scores[i] = base[i] + pen + align[i] + kw_bonus[i] if keep[i] else -np.inf
+        return scores
+except ImportError:
+    # NumPy fallback: same math, a couple of temporary arrays instead of the
+    # fused JIT loop
+    def _score_kernel(base, dist_km, max_km, align, kw_bonus, keep):
+        scores = base - 0.5 * np.maximum(0.0, dist_km - max_km) + align + kw_bonus
+        scores[~keep] = -np.inf
+        return scores
+
+def _rank_pool(pool: ResultPool, query: FindQuery,
+               kw_pat: Optional[re.Pattern],
+               avoid_pat: Optional[re.Pattern],
+               limit: Optional[int] = None) -> List[int]:
+    """Filter and score the pool in one vectorized pass.
+
+    Returns up to `limit` indices into the pool, best score first, with
+    avoided and under-rated businesses dropped.
+    """
+    n = len(pool.ids)
+    if n == 0:
+        return []
+    keep = pool.ratings >= float(query.get("min_rating", 0))
+    if avoid_pat is not None:
+        for i, hay in enumerate(pool.hays):
+            if keep[i] and avoid_pat.search(hay):
+                keep[i] = False
+
     max_km = float(query.get("distance_km", 3.0))
 
-    # Distance penalty
-    dist_pen = 0.0 if dist_km <= max_km else -0.5 * (dist_km - max_km)
-
-    # Price
-    price = b.get("price")
-    align = 0.0
-    if "budget" in query and price:
-        wanted = query["budget"]
-        diff = abs(len(price) - len(wanted))
-        align = max(0.0, 1.5 - 0.75 * diff)
-
-    # Keyword
-    kw_bonus = 0.0
-    kws = set([k.lower() for k in query.get("keywords", [])])
-    hay = (b.get("name","") + " " + " ".join(_category_names(b.get("categories",[])))).lower()
-    matches = sum(1 for k in kws if k in hay)
-    kw_bonus = 0.5 * matches
-    
-    # Review count diminishing returns
-    review_term = min(2.0, math.log10(1 + reviews) / math.log10(500 + 1) * 2.0)
-    return rating + review_term + dist_pen + align + kw_bonus
+    align = np.zeros(n)
+    wanted = query.get("budget")
+    if wanted:
+        for i, price in enumerate(pool.prices):
+            if price:
+                align[i] = max(0.0, 1.5 - 0.75 * abs(len(price) - len(wanted)))
+
+    kw_bonus = np.zeros(n)
+    if kw_pat is not None:
+        for i, hay in enumerate(pool.hays):
+            kw_bonus[i] = 0.5 * len(set(kw_pat.findall(hay)))
+
+    scores = _score_kernel(pool.base, pool.dist_km, max_km, align, kw_bonus, keep)
+    n_keep = int(keep.sum())
+    k = n_keep if limit is None else min(int(limit), n_keep)
+    if k == 0:
+        return []
+    if k < n:
+        # Partial selection: O(n) partition for the top k, then sort just those
+        # k instead of the whole pool (the nlargest pattern, in array form)
+        cand = np.argpartition(-scores, k - 1)[:k]
+        cand.sort()  # keep ties in original pool order, like a stable sort
+        order = cand[np.argsort(-scores[cand], kind="stable")]
+    else:
+        order = np.argsort(-scores, kind="stable")
+    return [int(i) for i in order[:k]]
+
+# Static portion of the search params, allocated (and its keys interned) once
+# at import and copied per call. limit is always Yelp's max page so follow-up
+# refinements can rerank locally; callers slice down to the user-requested
+# limit.
+_STATIC_PARAMS: Dict[str, Any] = {
+    sys.intern("limit"): "50",
+    sys.intern("sort_by"): sys.intern("best_match"),
+}
 
 async def _yelp_search(query: FindQuery) -> List[Dict[str, Any]]:
-    key = _require_yelp_key()
-    headers = {"Authorization": f"Bearer {key}"}
-    params: Dict[str, Any] = {
-        "limit": min(int(query.get("limit", 12)), 50),
-        "sort_by": "best_match",
-    }
+    params: Dict[str, Any] = _STATIC_PARAMS.copy()
     # location
     loc = query.get("location", {})
     if "latitude" in loc and "longitude" in loc:
@@ -152,55 +375,87 @@ async def _yelp_search(query: FindQuery) -> List[Dict[str, Any]]:
     if terms:
         params["term"] = " ".join(terms)
 
-    async with httpx.AsyncClient(timeout=8.0) as client:
-        r = await client.get("https://api.yelp.com/v3/businesses/search", headers=headers, params=params)
-        r.raise_for_status()
-        data = r.json()
-        return data.get("businesses", []) or []
+    key = _cache_key(params)
+    cached = _SEARCH_CACHE.get(key)
+    if cached is not None:
+        return cached
 
-async def _yelp_reviews(business_id: str) -> Optional[str]:
-    key = _require_yelp_key()
-    headers = {"Authorization": f"Bearer {key}"}
+    client = await _get_client()
+    async with client.get(
+        "https://api.yelp.com/v3/businesses/search",
+        params={k: str(v) for k, v in params.items()},  # yarl wants str values
+    ) as r:
+        r.raise_for_status()
+        data = orjson.loads(await r.read())
+    # Slim projection; the full decoded tree is garbage right after this line
+    businesses = [_project_business(b) for b in data.get("businesses", []) or []]
+    _SEARCH_CACHE[key] = businesses
+    return businesses
+
+def _trim_snippet(text: str) -> str:
+    # trim to ~160 chars
+    text = _WS_RE.sub(" ", text).strip()
+    return (text[:157] + "…") if len(text) > 160 else text
+
+async def _yelp_reviews_bulk(ids: List[str]) -> Dict[str, Optional[str]]:
+    """Fetch first-review snippets for several businesses in one GraphQL POST.
+
+    Aliased business(id:...) selections collapse N REST round-trips into a
+    single request. Misses come back as None.
+    """
+    out: Dict[str, Optional[str]] = {i: None for i in ids}
+    missing = [i for i in ids if i not in _REVIEWS_CACHE]
+    for i in ids:
+        if i in _REVIEWS_CACHE:
+            out[i] = _REVIEWS_CACHE[i]
+    if not missing:
+        return out
+    query = "{ " + " ".join(
+        f'b{n}: business(id: "{bid}") {{ reviews {{ text }} }}'
+        for n, bid in enumerate(missing)
+    ) + " }"
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            r = await client.get(f"https://api.yelp.com/v3/businesses/{business_id}/reviews", headers=headers)
+        client = await _get_client()
+        async with client.post(
+            "https://api.yelp.com/v3/graphql",
+            data=query,
+            headers={"Content-Type": "application/graphql"},
+        ) as r:
             r.raise_for_status()
-            js = r.json()
-            reviews = js.get("reviews", [])
-            if not reviews:
-                return None
-            text = reviews[0].get("text") or ""
-            # trim to ~160 chars
-            text = re.sub(r"\s+", " ", text).strip()
-            return (text[:157] + "…") if len(text) > 160 else text
+            data = orjson.loads(await r.read()).get("data") or {}
+        for n, bid in enumerate(missing):
+            node = data.get(f"b{n}") or {}
+            reviews = node.get("reviews") or []
+            text = (reviews[0].get("text") or "") if reviews else ""
+            snippet = _trim_snippet(text) if text else None
+            _REVIEWS_CACHE[bid] = snippet
+            out[bid] = snippet
     except Exception:
-        return None
-
-def _filter_avoid(businesses: List[Dict[str, Any]], avoid: List[str]) -> List[Dict[str, Any]]:
-    if not avoid:
-        return businesses
-    avoid_l = [a.lower() for a in avoid]
-    out = []
-    for b in businesses:
-        hay = (b.get("name","") + " " + " ".join(_category_names(b.get("categories",[])))).lower()
-        if any(a in hay for a in avoid_l):
-            continue
-        out.append(b)
+        pass
     return out
 
+def _base_score(rating: float, review_count: int) -> float:
+    review_term = min(2.0, math.log10(1 + review_count) * _INV_LOG10_501_x2) if review_count else 0.0
+    return rating + review_term
+
 def _to_restaurant(b: Dict[str, Any]) -> Restaurant:
+    rating = float(b.get("rating", 0))
+    review_count = int(b.get("review_count", 0))
     return {
         "id": b.get("id"),
         "name": b.get("name"),
-        "rating": float(b.get("rating", 0)),
-        "review_count": int(b.get("review_count", 0)),
+        "rating": rating,
+        "review_count": review_count,
         "price": b.get("price"),
-        "categories": _category_names(b.get("categories", [])),
+        "categories": _cat_titles(b),
         "url": b.get("url"),
-        "address": _join_address(b.get("location", {})),
+        # Projected businesses carry a pre-joined address; older persisted
+        # pools still have the raw location dict
+        "address": b.get("address") or _join_address(b.get("location", {})),
         "distance_km": _km(float(b.get("distance", 0))),
         "phone": b.get("display_phone"),
         "snippet": None,
+        "_base_score": _base_score(rating, review_count),
     }
 
 
@@ -227,6 +482,7 @@ def set_dinner_prefs(preferences: Preferences, profile: str = "default") -> Dict
     """
     st = _profile(profile)
     st["prefs"].update(preferences or {})
+    _save_profile(profile)
     return {"ok": True, "stored": st["prefs"]}
 
 @mcp.tool()
@@ -254,21 +510,20 @@ async def find_dinner(query: FindQuery, profile: str = "default") -> SearchResul
     merged.setdefault("limit", 12)
 
     businesses = await _yelp_search(merged)
-    businesses = _filter_avoid(businesses, merged.get("avoid", []))
-    # Filter by min_rating
-    min_rating = float(merged.get("min_rating", 0))
-    businesses = [b for b in businesses if float(b.get("rating", 0)) >= min_rating]
-
-    # Score & sort
-    scored = sorted(businesses, key=lambda b: _score_business(b, merged), reverse=True)
-    top = scored[: int(merged.get("limit", 12))]
-    # Map to result & fetch review
-    results: List[Restaurant] = [_to_restaurant(b) for b in top]
-    for i in range(min(5, len(results))):
-        results[i]["snippet"] = await _yelp_reviews(results[i]["id"])
+    st["_raw_pool"] = businesses
+    pool = ResultPool.from_businesses(businesses)
+    _POOLS[profile] = pool
+
+    # Filter, score & sort in one vectorized pass over the pool
+    kw_pat = _compile_terms(merged.get("keywords", []))
+    avoid_pat = _compile_terms(merged.get("avoid", []))
+    idx = _rank_pool(pool, merged, kw_pat, avoid_pat, limit=int(merged.get("limit", 12)))
+    top = [pool.raw[i] for i in idx]
+    # Kick off the batched snippet fetch right away so the network wait
+    # overlaps the local mapping/persistence work below
+    snippet_task = asyncio.create_task(_yelp_reviews_bulk([b.get("id") for b in top[:5]]))
 
-    st["last_query"] = merged
-    st["last_results"] = results
+    results: List[Restaurant] = [_to_restaurant(b) for b in top]
 
     tips: List[str] = []
     if not results:
@@ -276,6 +531,14 @@ async def find_dinner(query: FindQuery, profile: str = "default") -> SearchResul
     else:
         tips.append("You can say things like: 'closer', 'cheaper', 'more spicy', 'kid-friendly', or 'not pizza'.")
 
+    snippets = await snippet_task
+    for r in results[:5]:
+        r["snippet"] = snippets.get(r["id"])
+
+    st["last_query"] = merged
+    st["last_results"] = results
+    _save_profile(profile)
+
     return {"query_used": merged, "restaurants": results, "tips": tips}
 
 @mcp.tool()
@@ -305,45 +568,73 @@ def refine_dinner(instruction: str, profile: str = "default") -> SearchResult:
         else:
             q["budget"] = "$"
     if "fancier" in instr or "nicer" in instr or "date night" in instr:
-        q["vibe"] = list(set(q.get("vibe", []) + ["romantic", "date night"]))
+        q["vibe"] = _extend_unique(q.get("vibe", []), ["romantic", "date night"])
         q["min_rating"] = max(float(q.get("min_rating", 4.0)), 4.3)
     if "kid" in instr or "family" in instr:
-        q["vibe"] = list(set(q.get("vibe", []) + ["family"]))
+        q["vibe"] = _extend_unique(q.get("vibe", []), ["family"])
     if "open now" in instr:
         q["open_now"] = True
     if "open late" in instr or "open later" in instr:
         q["open_now"] = True
 
-    m = re.findall(r"(no|not)\s+([a-zA-Z\- ]+)", instr)
+    m = _NO_RE.findall(instr)
     if m:
-        avoid = q.get("avoid", [])
-        for _, term in m:
-            avoid.append(term.strip())
-        q["avoid"] = list(set(avoid))
+        q["avoid"] = _extend_unique(q.get("avoid", []), [term.strip() for _, term in m])
 
-    add_cuis = re.findall(r"(?:want|craving|more|prefer)\s+([a-zA-Z\- ]+)", instr)
+    add_cuis = _CUIS_RE.findall(instr)
     if add_cuis:
-        cuisines = q.get("cuisines", [])
-        for term in add_cuis:
-            cuisines.append(term.strip())
-        q["cuisines"] = list(set(cuisines))
+        q["cuisines"] = _extend_unique(q.get("cuisines", []), [term.strip() for term in add_cuis])
 
     st["last_query"] = q
 
-    # Rerank
-    filtered = [r for r in last_r if not any(a.lower() in (r["name"] + " " + " ".join(r["categories"])).lower()
-                    for a in q.get("avoid", []))]
+    # Rerank the cached raw pool when we have one: the original search pulled
+    # Yelp's full 50-business page, so most refinements can re-filter and
+    # re-score locally without another network call.
+    pool = _pool_for(profile, st)
+    if pool is not None:
+        kw_pat = _compile_terms(q.get("keywords", []))
+        avoid_pat = _compile_terms(q.get("avoid", []))
+        idx = _rank_pool(pool, q, kw_pat, avoid_pat, limit=int(q.get("limit", 12)))
+        ranked = [_to_restaurant(pool.raw[i]) for i in idx]
+        # Carry over snippets already fetched for these ids
+        known = {r["id"]: r.get("snippet") for r in last_r}
+        for r in ranked:
+            r["snippet"] = known.get(r["id"])
+        st["last_results"] = ranked
+        _save_profile(profile)
+        tips = ["Say 'search again' to fetch fresh options from Yelp with your refined query."]
+        return {"query_used": q, "restaurants": ranked, "tips": tips}
+
+    _save_profile(profile)
+
+    # No pool in memory (e.g. state from an older server): rerank last_results
+    avoid_pat = _compile_terms(q.get("avoid", []))
+    filtered = [r for r in last_r
+                if avoid_pat is None or not avoid_pat.search((r["name"] + " " + " ".join(r["categories"])).lower())]
+
+    kw_pat = _compile_terms(q.get("keywords", []))
+
+    max_km = float(q.get("distance_km", 3.0))
+    wanted = q.get("budget")
 
     def _score_rest(r: Restaurant) -> float:
-        fake_biz = {
-            "name": r["name"],
-            "rating": r["rating"],
-            "review_count": r["review_count"],
-            "distance": r["distance_km"] * 1000.0,
-            "price": r.get("price"),
-            "categories": [{"title": c} for c in r.get("categories", [])],
-        }
-        return _score_business(fake_biz, q)
+        # rating + review term never change between refinements, so reuse the
+        # value cached by _to_restaurant and recompute only the query-dependent
+        # terms. Results persisted before the cache existed fall back cleanly.
+        base = r.get("_base_score")
+        if base is None:
+            base = _base_score(r["rating"], r["review_count"])
+        dist_km = r["distance_km"]
+        dist_pen = 0.0 if dist_km <= max_km else -0.5 * (dist_km - max_km)
+        align = 0.0
+        price = r.get("price")
+        if wanted and price:
+            align = max(0.0, 1.5 - 0.75 * abs(len(price) - len(wanted)))
+        kw_bonus = 0.0
+        if kw_pat is not None:
+            hay = (r["name"] + " " + " ".join(r["categories"])).lower()
+            kw_bonus = 0.5 * len(set(kw_pat.findall(hay)))
+        return base + dist_pen + align + kw_bonus
 
     ranked = sorted(filtered, key=_score_rest, reverse=True)
     tips = ["Say 'search again' to fetch fresh options from Yelp with your refined query."]
@@ -360,15 +651,22 @@ async def search_again(profile: str = "default") -> SearchResult:
     if not q:
         return {"query_used": {}, "restaurants": [], "tips": ["No query in memory. Use find_dinner first."]}
     businesses = await _yelp_search(q)
-    businesses = _filter_avoid(businesses, q.get("avoid", []))
-    min_rating = float(q.get("min_rating", 0))
-    businesses = [b for b in businesses if float(b.get("rating", 0)) >= min_rating]
-    top = sorted(businesses, key=lambda b: _score_business(b, q), reverse=True)[: int(q.get("limit", 12))]
+    st["_raw_pool"] = businesses
+    pool = ResultPool.from_businesses(businesses)
+    _POOLS[profile] = pool
+    kw_pat = _compile_terms(q.get("keywords", []))
+    avoid_pat = _compile_terms(q.get("avoid", []))
+    idx = _rank_pool(pool, q, kw_pat, avoid_pat, limit=int(q.get("limit", 12)))
+    top = [pool.raw[i] for i in idx]
     results = [_to_restaurant(b) for b in top]
     st["last_results"] = results
+    _save_profile(profile)
     return {"query_used": q, "restaurants": results, "tips": ["Refined search complete."]}
 
 @mcp.resource("dinner-memory://{profile}")
 def memory_resource(profile: str = "default") -> str:
     st = _profile(profile)
-    return json.dumps({"prefs": st["prefs"], "last_query": st["last_query"], "last_count": len(st["last_results"])}, ensure_ascii=False, indent=2)
+    return orjson.dumps(
+        {"prefs": st["prefs"], "last_query": st["last_query"], "last_count": len(st["last_results"])},
+        option=orjson.OPT_INDENT_2,
+    ).decode()